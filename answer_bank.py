@@ -0,0 +1,281 @@
+"""Precomputed answers for the MCQs in the question bank.
+
+The offline job extracts MCQs (stem, options and the printed answer key when the
+guide has one) from the 'question' chunks, asks the LLM once per question and
+stores the answers in an indexed SQLite table. At query time AnswerBank serves
+high-confidence matches straight from that table, without an OpenAI call.
+
+    python answer_bank.py build            # resumable; only new questions hit the LLM
+    python answer_bank.py stats
+"""
+import argparse
+import json
+import re
+import sqlite3
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from coalescing import normalize_question
+
+OPTION_LETTERS = ['ক', 'খ', 'গ', 'ঘ']
+
+# (ক) option (খ) option (গ) option (ঘ) option [উত্তর: গ] -- parentheses are optional in the OCR text
+MCQ_PATTERN = re.compile(
+    r'\(?ক\)\s*(?P<a>.+?)\s*\(?খ\)\s*(?P<b>.+?)\s*\(?গ\)\s*(?P<c>.+?)\s*\(?ঘ\)\s*'
+    r'(?P<d>(?!উত্তর)[^\s\[]+(?:\s+(?!উত্তর)(?!উক্ত)[^\s\[০-৯][^\s\[]*)?)'
+    r'(?:\s*উত্তর\s*:\s*(?P<key>[কখগঘ]))?'
+)
+# Where a question stem can start: after the previous answer key, a question number (OCR sometimes
+# garbles its first digit), a sentence end or table rule, the previous question's options or its
+# "নিচের কোনটি সঠিক" tail, or a stimulus sentence ending in a future or negative-past verb
+STEM_BOUNDARY = re.compile(
+    r'উত্তর\s*:\s*[কখগঘ]|(?:^|\s)\S?[০-৯]+(?=\s)|[।?|\])]|নিচের কোনটি (?:সঠিক|ঠিক)|করবে|পারবে'
+    r'|\S*(?:েননি|েনি)(?=\s)'
+)
+# Stimulus-based stems start at the reference to the stimulus or to the story; whatever comes
+# before it is the tail of the stimulus paragraph
+STIMULUS_ANCHOR = re.compile(r'উদ্দীপক|[\'"“‘]অপরিচিতা')
+# Exam-source tag printed after some stems: [ঢা. বো. '১৯]
+SOURCE_TAG = re.compile(r'\s\[.*$')
+MAX_STEM_WORDS = 15
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    question_key TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    answer_key TEXT,
+    answer TEXT NOT NULL,
+    source_chunk_id INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_answers_source_chunk ON answers (source_chunk_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# Words that may differ between a question and a stored stem without changing what is asked:
+# conjunctions, demonstratives, copulas/auxiliaries and the stimulus/story framing. A single
+# content word (a name, মিল vs বৈসাদৃশ্য) asks another question, and so do interrogatives and
+# negations, which are deliberately not listed
+STOPWORDS = {unicodedata.normalize('NFC', word) for word in (
+    'এবং', 'আর', 'বা', 'অথবা', 'কিন্তু', 'তবে',
+    'এই', 'সেই', 'ওই', 'উক্ত', 'এটি', 'এটা', 'সেটি', 'তার', 'তাঁর',
+    'হয়', 'হয়েছে', 'হলো', 'হল', 'ছিল', 'ছিলো', 'আছে', 'রয়েছে', 'থাকে',
+    'নিচের', 'উল্লিখিত', 'উদ্দীপক', 'উদ্দীপকে', 'উদ্দীপকের', 'উদ্দীপকটি', 'উদ্দীপকটিতে',
+    'অপরিচিতা', 'গল্প', 'গল্পের', 'গল্পে', 'গল্পটি', 'গল্পটিতে',
+)}
+
+
+def _tokens(text: str) -> set:
+    # Split on whitespace/punctuation rather than \w, which breaks Bangla words at vowel signs;
+    # NFC so that য় / ড় / ঢ় compare equal however they were typed
+    text = unicodedata.normalize('NFC', text)
+    return {word for word in re.split(r'[\s,।?!:;\'"“”‘’()\[\]-]+', text) if len(word) > 1}
+
+
+def _only_stopwords_differ(query_tokens: set, stored_tokens: set) -> bool:
+    return (query_tokens ^ stored_tokens) <= STOPWORDS
+
+
+def parse_mcqs(text: str) -> List[Dict]:
+    """Well-formed MCQs in one chunk text: stem, options and the printed answer key (or None)"""
+    mcqs = []
+    for match in MCQ_PATTERN.finditer(text):
+        options = [match.group(g).strip(' ,|।-') for g in 'abcd']
+        if not all(options) or any(len(option) > 40 for option in options):
+            continue  # OCR lost or merged the options
+
+        prefix = text[:match.start()]
+        boundaries = list(STEM_BOUNDARY.finditer(prefix))
+        stem = prefix[boundaries[-1].end():] if boundaries else prefix
+        if 'উদ্দীপক' in stem:
+            stem = stem[STIMULUS_ANCHOR.search(stem).start():]
+        stem = SOURCE_TAG.sub('', stem)
+        if len(stem.split()) > MAX_STEM_WORDS:
+            continue  # no boundary found: the stem would start mid-sentence
+        stem = ' '.join(stem.split()).strip(' ,-:')
+        if len(stem.split()) < 3:
+            continue
+        mcqs.append({'question': stem, 'options': options, 'answer_key': match.group('key')})
+    return mcqs
+
+
+def extract_mcqs(chunks) -> List[Dict]:
+    """Extract MCQs from 'question' chunks, de-duplicated by normalized stem"""
+    questions = {}
+    for chunk in chunks:
+        if chunk['type'] != 'question':
+            continue
+        for mcq in parse_mcqs(chunk['text']):
+            key = normalize_question(mcq['question'])
+            if key not in questions:
+                questions[key] = {'question_key': key, **mcq, 'source_chunk_id': chunk['id']}
+    return list(questions.values())
+
+
+def format_mcq(question: Dict) -> str:
+    options = ' '.join(f"({letter}) {option}" for letter, option in zip(OPTION_LETTERS, question['options']))
+    return f"{question['question']} {options}"
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(db_path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def chunk_fingerprint(connection: sqlite3.Connection) -> Optional[str]:
+    """Fingerprint of the chunk store the stored answers were built against"""
+    row = connection.execute("SELECT value FROM meta WHERE key = 'chunk_fingerprint'").fetchone()
+    return row[0] if row else None
+
+
+def build(db_path: str, limit: Optional[int] = None):
+    """Precompute answers for every extracted MCQ that is not in the table yet"""
+    from basic_rag import BasicBanglaRAG
+
+    rag = BasicBanglaRAG()
+    questions = extract_mcqs(rag.chunks)
+    connection = connect(db_path)
+    if chunk_fingerprint(connection) != rag.chunks.fingerprint:
+        # Answers and source chunk ids from other content cannot be trusted
+        cleared = connection.execute("DELETE FROM answers").rowcount
+        connection.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('chunk_fingerprint', ?)", (rag.chunks.fingerprint,)
+        )
+        connection.commit()
+        if cleared:
+            print(f"🧹 Content changed since the last build, cleared {cleared} answers")
+    # Rows whose stem is no longer extracted (e.g. after a parser fix) would never match again
+    current = [(q['question_key'],) for q in questions]
+    connection.execute("CREATE TEMP TABLE current_keys (question_key TEXT PRIMARY KEY)")
+    connection.executemany("INSERT OR IGNORE INTO current_keys VALUES (?)", current)
+    pruned = connection.execute(
+        "DELETE FROM answers WHERE question_key NOT IN (SELECT question_key FROM current_keys)"
+    ).rowcount
+    connection.commit()
+    if pruned:
+        print(f"🧹 Removed {pruned} answers for questions that are no longer extracted")
+    done = {row[0] for row in connection.execute("SELECT question_key FROM answers")}
+    pending = [q for q in questions if q['question_key'] not in done]
+    if limit is not None:
+        pending = pending[:limit]
+    print(f"📝 {len(questions)} MCQs extracted, {len(done)} already answered, {len(pending)} to go")
+
+    for i, question in enumerate(pending, 1):
+        text = format_mcq(question)
+        if question['answer_key']:
+            text += f" (উত্তর: {question['answer_key']})"
+        relevant_chunks = rag.retrieve(text, 'hybrid')
+        source = rag.chunks.get_by_id(question['source_chunk_id'])
+        if source is not None and all(chunk.id != source.id for chunk in relevant_chunks):
+            relevant_chunks = [source] + relevant_chunks
+        answer = rag.generate_answer(text, relevant_chunks)
+        if answer.startswith("দুঃখিত,"):
+            # generate_answer reports OpenAI failures as an apology; retry on the next run
+            print(f"⚠️ [{i}/{len(pending)}] No answer generated, skipping: {question['question'][:60]}")
+            continue
+
+        # Commit per question, so an interrupted build resumes where it stopped
+        connection.execute(
+            "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (question['question_key'], question['question'], json.dumps(question['options'], ensure_ascii=False),
+             question['answer_key'], answer, question['source_chunk_id'], datetime.now().isoformat())
+        )
+        connection.commit()
+        print(f"✅ [{i}/{len(pending)}] {question['question'][:60]}")
+
+    connection.close()
+
+
+class AnswerBank:
+    """In-memory lookup over the precomputed answer table.
+
+    A question matches when its normalized text equals a stored stem, or when it
+    differs from a stored stem, or stem plus options, only in STOPWORDS. The word
+    overlap (Jaccard) is the confidence and must still reach min_similarity, so a
+    few content words padded with framing do not match. Anything else, even one
+    swapped name, goes to retrieval and the LLM.
+    """
+
+    def __init__(self, rows: List[Dict], min_similarity: float = 0.6, min_tokens: int = 3):
+        self.rows = rows
+        self.min_similarity = min_similarity
+        self.min_tokens = min_tokens
+        self.by_key = {row['question_key']: row for row in rows}
+        self.row_tokens = []
+        self.inverted = {}
+        for position, row in enumerate(rows):
+            stem_tokens = _tokens(row['question_key'])
+            full_tokens = stem_tokens | _tokens(' '.join(row['options']).casefold())
+            self.row_tokens.append((stem_tokens, full_tokens))
+            for token in stem_tokens:
+                self.inverted.setdefault(token, []).append(position)
+
+    @classmethod
+    def load(cls, db_path: str, fingerprint: Optional[str] = None, **kwargs) -> Optional['AnswerBank']:
+        """Load the table; None when it was built against other chunks than `fingerprint`"""
+        connection = connect(db_path)
+        if fingerprint is not None and chunk_fingerprint(connection) != fingerprint:
+            connection.close()
+            print("⚠️ Answer bank was built for different content, ignoring it (re-run answer_bank.py build)")
+            return None
+        connection.row_factory = sqlite3.Row
+        rows = []
+        for row in connection.execute("SELECT * FROM answers"):
+            row = dict(row)
+            row['options'] = json.loads(row['options'])
+            rows.append(row)
+        connection.close()
+        print(f"📗 Loaded {len(rows)} precomputed answers")
+        return cls(rows, **kwargs)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        """Best stored answer for a question with its confidence, or None"""
+        key = normalize_question(question)
+        row = self.by_key.get(key)
+        if row is not None:
+            return {**row, 'confidence': 1.0}
+
+        query_tokens = _tokens(key)
+        if len(query_tokens) < self.min_tokens:
+            return None
+        candidates = {position for token in query_tokens for position in self.inverted.get(token, ())}
+        best, best_score = None, 0.0
+        for position in candidates:
+            for stored in self.row_tokens[position]:
+                score = len(query_tokens & stored) / len(query_tokens | stored)
+                if score > best_score and _only_stopwords_differ(query_tokens, stored):
+                    best, best_score = self.rows[position], score
+        if best is None or best_score < self.min_similarity:
+            return None
+        return {**best, 'confidence': round(best_score, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed answer bank for the HSC question bank")
+    parser.add_argument('command', choices=['build', 'stats'])
+    parser.add_argument('--db', default='answer_bank.sqlite')
+    parser.add_argument('--limit', type=int, default=None, help="answer at most this many new questions")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build(args.db, args.limit)
+    else:
+        connection = connect(args.db)
+        total, keyed = connection.execute("SELECT COUNT(*), COUNT(answer_key) FROM answers").fetchone()
+        print(f"📊 {total} precomputed answers ({keyed} with a printed answer key), "
+              f"chunk fingerprint {(chunk_fingerprint(connection) or 'unknown')[:12]}")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,44 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Header, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import uvicorn
 from basic_rag import BasicBanglaRAG
+from build_embeddings import EMBEDDING_MODEL_NAME
+from coalescing import SingleFlight, request_key
+from hot_reload import IndexFileWatcher
+from profiling import SamplingProfiler, profiler
+import asyncio
 from datetime import datetime
+import hashlib
 import os
+import signal
+import threading
+from functools import lru_cache
 from dotenv import load_dotenv
 
+# Optional fast JSON serializer and brotli compression
+try:
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+    import orjson  # noqa: F401
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="অপরিচিতা RAG API", description="API for Bangla RAG chatbot")
+app = FastAPI(
+    title="অপরিচিতা RAG API",
+    description="API for Bangla RAG chatbot",
+    default_response_class=FastJSONResponse
+)
 
 # Add CORS middleware for React frontend
 app.add_middleware(
@@ -22,19 +49,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses for mobile clients (brotli when available, gzip otherwise)
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=500, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Set by serve.py (in the launcher and its workers): the launcher then owns reloads
+# (one builder, shared result) and keeps encoder inference out of the process it forks
+LAUNCHER_PID = int(os.getenv('RAG_LAUNCHER_PID', '0')) or None
+
 # Initialize RAG system
 try:
-    rag_system = BasicBanglaRAG()
+    rag_system = BasicBanglaRAG(isolate_inference=LAUNCHER_PID is not None)
     print("✅ RAG system initialized successfully")
 except Exception as e:
     print(f"❌ Failed to initialize RAG system: {e}")
     rag_system = None
 
+# Identical concurrent questions share one retrieval + OpenAI call
+single_flight = SingleFlight()
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+# Seconds between checks of processed_data.json for changes (0 disables the watcher)
+INDEX_WATCH_INTERVAL = float(os.getenv('INDEX_WATCH_INTERVAL', '10'))
+
+def _coalescing_key(request):
+    # Versioned, so requests arriving after a reload never join a computation on the old index
+    return f"v{rag_system.index.version}|" + request_key(
+        request.question, request.search_method, request.conversation_history
+    )
+
+def _on_index_reloaded(index):
+    # Cached chunk payloads belong to the previous version
+    _serialized_chunk.cache_clear()
+
+def _require_admin(token: Optional[str]):
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin access denied")
+
+def _reload_in_background():
+    try:
+        rag_system.reload()
+    except Exception as e:
+        print(f"❌ Index reload failed: {e}")
+
+if rag_system:
+    rag_system.reload_listeners.append(_on_index_reloaded)
+
+@app.on_event("startup")
+async def start_index_watcher():
+    """Start the file watcher (not in serve.py workers, where the launcher watches the files)"""
+    if rag_system and INDEX_WATCH_INTERVAL > 0 and LAUNCHER_PID is None:
+        IndexFileWatcher(
+            [rag_system.processed_data_file, rag_system.answer_bank_file],
+            on_change=_reload_in_background,
+            interval=INDEX_WATCH_INTERVAL
+        ).start()
+
 # Pydantic models for request/response
 class QuestionRequest(BaseModel):
     question: str
     search_method: str = "hybrid"  # hybrid, vector, keyword
     conversation_history: Optional[List[Dict[str, Any]]] = []
+    include_chunks: bool = False  # attach chunk text to relevant_chunks (otherwise id + score only)
 
 class QuestionResponse(BaseModel):
     answer: str
@@ -46,6 +125,11 @@ class QuestionResponse(BaseModel):
     success: bool = True
     error: Optional[str] = None
 
+class ChunkResponse(BaseModel):
+    id: int
+    type: str
+    text: str
+
 class HealthResponse(BaseModel):
     status: str
     rag_system_loaded: bool
@@ -69,34 +153,82 @@ async def query_question(request: QuestionRequest):
         raise HTTPException(status_code=500, detail="RAG system not initialized")
     if not request.question or not request.question.strip():
         raise HTTPException(status_code=400, detail="প্রশ্ন ফাঁকা রাখা যাবে না!")
+    # Responses are built as plain dicts and serialized directly, skipping a second
+    # pydantic validation pass over the chunk payloads.
     try:
-        # Process the query
-        result = rag_system.query(
+        # Process the query (coalesced with identical in-flight questions, off the event loop)
+        result = await single_flight.do(_coalescing_key(request), lambda: rag_system.query(
             question=request.question,
             search_method=request.search_method,
-            conversation_history=request.conversation_history
-        )
-        return QuestionResponse(
-            success=True,
-            error=None,
-            answer=result['answer'],
-            search_method=result.get('search_method', request.search_method),
-            relevant_chunks=result.get('relevant_chunks', []),
-            used_conversation_memory=result.get('used_conversation_memory', False),
-            timestamp=datetime.now().isoformat(),
-            question=request.question
-        )
+            conversation_history=request.conversation_history,
+            include_chunks=True
+        ))
+        relevant_chunks = result.get('relevant_chunks', [])
+        if not request.include_chunks:
+            # The result may be shared with other requests, so strip text on a copy
+            relevant_chunks = [
+                {k: v for k, v in chunk.items() if k != 'text'} for chunk in relevant_chunks
+            ]
+        return FastJSONResponse({
+            "success": True,
+            "error": None,
+            "answer": result['answer'],
+            "search_method": result.get('search_method', request.search_method),
+            "relevant_chunks": relevant_chunks,
+            "used_conversation_memory": result.get('used_conversation_memory', False),
+            "timestamp": datetime.now().isoformat(),
+            "question": request.question
+        })
     except Exception as e:
-        return QuestionResponse(
-            success=False,
-            error=f"Error processing query: {str(e)}",
-            answer="",
-            search_method=request.search_method,
-            relevant_chunks=[],
-            used_conversation_memory=False,
-            timestamp=datetime.now().isoformat(),
-            question=request.question
-        )
+        return FastJSONResponse({
+            "success": False,
+            "error": f"Error processing query: {str(e)}",
+            "answer": "",
+            "search_method": request.search_method,
+            "relevant_chunks": [],
+            "used_conversation_memory": False,
+            "timestamp": datetime.now().isoformat(),
+            "question": request.question
+        })
+
+@app.post("/api/query/stream")
+async def query_question_stream(request: QuestionRequest):
+    """Stream the answer as plain text; identical in-flight questions share one stream"""
+    if not rag_system:
+        raise HTTPException(status_code=500, detail="RAG system not initialized")
+    if not request.question or not request.question.strip():
+        raise HTTPException(status_code=400, detail="প্রশ্ন ফাঁকা রাখা যাবে না!")
+    pieces = single_flight.stream(_coalescing_key(request), lambda: rag_system.query_stream(
+        question=request.question,
+        search_method=request.search_method,
+        conversation_history=request.conversation_history
+    ))
+    return StreamingResponse(pieces, media_type="text/plain; charset=utf-8")
+
+@lru_cache(maxsize=1024)
+def _serialized_chunk(index, chunk_id: int) -> Optional[Tuple[bytes, str]]:
+    """Serialized chunk payload and its ETag, cached per index version (cleared on reload)"""
+    chunk = index.chunks.get_by_id(chunk_id)
+    if chunk is None:
+        return None
+    body = FastJSONResponse({"id": chunk.id, "type": chunk.type, "text": chunk.text}).body
+    # Content-derived, so it stays valid across workers and restarts and changes with the text
+    return body, f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+@app.get("/api/chunks/{chunk_id}", response_model=ChunkResponse)
+async def get_chunk(chunk_id: int, if_none_match: Optional[str] = Header(None)):
+    """Get the full text of a single chunk"""
+    if not rag_system:
+        raise HTTPException(status_code=500, detail="RAG system not initialized")
+    serialized = _serialized_chunk(rag_system.index, chunk_id)
+    if serialized is None:
+        raise HTTPException(status_code=404, detail=f"Chunk {chunk_id} not found")
+    body, etag = serialized
+    # Cacheable, but revalidated on every use, so a reload is never hidden by a stale copy
+    headers = {"Cache-Control": "public, no-cache", "ETag": etag}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/api/search-methods")
 async def get_search_methods():
@@ -157,9 +289,64 @@ async def get_stats():
     
     return {
         "total_chunks": len(rag_system.chunks),
-        "embedding_dimensions": len(rag_system.embeddings[0]) if rag_system.embeddings else 0,
-        "model_name": "paraphrase-multilingual-MiniLM-L12-v2",
-        "api_status": "active"
+        "embedding_dimensions": int(rag_system.embeddings.shape[1]) if len(rag_system.embeddings) else 0,
+        "model_name": EMBEDDING_MODEL_NAME,
+        "api_status": "active",
+        "index_version": rag_system.index.version,
+        "index_loaded_at": datetime.fromtimestamp(rag_system.index.loaded_at).isoformat(),
+        "index_reloading": rag_system.reloading,
+        "coalescing": single_flight.stats()
+    }
+
+@app.post("/api/admin/reload", status_code=status.HTTP_202_ACCEPTED)
+async def reload_index(x_admin_token: Optional[str] = Header(None)):
+    """Rebuild chunks, embeddings and indexes in the background and swap them in"""
+    _require_admin(x_admin_token)
+    if not rag_system:
+        raise HTTPException(status_code=500, detail="RAG system not initialized")
+    if LAUNCHER_PID is not None:
+        # Under serve.py the launcher rebuilds once and replaces every worker
+        os.kill(LAUNCHER_PID, signal.SIGHUP)
+        return {"status": "requested", "index_version": rag_system.index.version}
+    if rag_system.reloading:
+        return {"status": "already_running", "index_version": rag_system.index.version}
+    
+    threading.Thread(target=_reload_in_background, name="index-reload", daemon=True).start()
+    return {"status": "started", "index_version": rag_system.index.version}
+
+@app.get("/api/admin/profile")
+async def capture_profile(seconds: float = 10.0, format: str = "speedscope", interval_ms: float = 5.0,
+                          x_admin_token: Optional[str] = Header(None)):
+    """Sample every thread's stack for a few seconds and return a speedscope or collapsed-stack file"""
+    _require_admin(x_admin_token)
+    if format not in ("speedscope", "collapsed"):
+        raise HTTPException(status_code=400, detail="format must be 'speedscope' or 'collapsed'")
+    seconds = min(max(seconds, 0.1), 60.0)
+    interval = min(max(interval_ms, 1.0), 1000.0) / 1000
+    
+    # Sample from a worker thread, so the event loop keeps serving the traffic being profiled
+    sampler = await asyncio.get_running_loop().run_in_executor(
+        None, SamplingProfiler(interval).capture, seconds
+    )
+    filename = datetime.now().strftime("profile-%Y%m%d-%H%M%S")
+    if format == "collapsed":
+        return PlainTextResponse(
+            sampler.to_collapsed(),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.collapsed.txt"'}
+        )
+    return FastJSONResponse(
+        sampler.to_speedscope(name=f"অপরিচিতা RAG API ({seconds:g}s)"),
+        headers={"Content-Disposition": f'attachment; filename="{filename}.speedscope.json"'}
+    )
+
+@app.get("/api/admin/profiles/recent")
+async def recent_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Per-stage timings, allocations and top functions of recently sampled queries"""
+    _require_admin(x_admin_token)
+    return {
+        "sample_rate": profiler.sample_rate,
+        "trace_memory": profiler.trace_memory,
+        "profiles": profiler.recent_profiles()
     }
 
 if __name__ == "__main__":
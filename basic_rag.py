@@ -1,36 +1,66 @@
-import json
 import os
 from dotenv import load_dotenv
 import openai
 import re
+import threading
+import time
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import pickle
+from chunk_store import ChunkStore, ChunkView, KeywordIndex
+from retrieval_planner import RetrievalPlan, RetrievalPlanner
+from answer_bank import AnswerBank
+from profiling import profiler, stage
+from build_embeddings import EMBEDDING_MODEL_NAME, build_embeddings, encode_in_subprocess
 
 # Load environment variables
 load_dotenv()
 
+class RetrievalIndex:
+    """Immutable, versioned bundle of everything retrieval reads: chunks, embeddings and indexes.
+
+    Queries grab one RetrievalIndex reference and use it throughout, so a reload
+    that swaps in a new version never mixes old and new data inside one query.
+    """
+    
+    def __init__(self, version, chunks, embeddings, vector_index, keyword_index, answer_bank=None):
+        self.version = version
+        self.chunks = chunks
+        self.embeddings = embeddings
+        self.vector_index = vector_index
+        self.keyword_index = keyword_index
+        self.answer_bank = answer_bank
+        self.loaded_at = time.time()
+
 class BasicBanglaRAG:
-    def __init__(self, processed_data_file='processed_data.json', embeddings_file='embeddings.pkl'):
+    NOT_FOUND_ANSWER = "দুঃখিত, এই প্রশ্নের উত্তর খুঁজে পাওয়া যায়নি। অন্য প্রশ্ন করার চেষ্টা করুন।\n\nSorry, answer not found for this question. Try asking differently."
+    
+    def __init__(self, processed_data_file='processed_data.json', embeddings_file='embeddings.pkl',
+                 chunk_store_dir='chunk_store', answer_bank_file='answer_bank.sqlite', isolate_inference=False):
         """Basic RAG system for Bangla PDF chatbot with vector search"""
         
         # Initialize OpenAI
         self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         
-        # Load processed data
-        with open(processed_data_file, 'r', encoding='utf-8') as f:
-            self.data = json.load(f)
-        
-        self.chunks = self.data['chunks']
+        self.processed_data_file = processed_data_file
         self.embeddings_file = embeddings_file
+        self.chunk_store_dir = chunk_store_dir
+        self.answer_bank_file = answer_bank_file
+        # Encode chunks in a spawned subprocess (set by processes that fork workers afterwards,
+        # since torch thread pools started here would not survive the fork)
+        self.isolate_inference = isolate_inference
         
         # Initialize sentence transformer for multilingual support
         print("🤖 Loading multilingual sentence transformer...")
-        self.encoder = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+        self.encoder = SentenceTransformer(EMBEDDING_MODEL_NAME)
         
-        # Load or create embeddings
-        self.embeddings = self._load_or_create_embeddings()
+        # Load chunks, embeddings and search indexes (swapped atomically on reload)
+        self.index = self._build_index(version=1)
+        self.reload_listeners = []
+        self._reload_lock = threading.Lock()
+        
+        # Decides per question how much retrieval (and whether LLM) work is needed
+        self.planner = RetrievalPlanner()
         
         # Banglish to Bangla transliteration mapping
         self.banglish_mapping = {
@@ -214,40 +244,141 @@ class BasicBanglaRAG:
         print(f"🔤 Banglish support enabled with {len(self.banglish_mapping)} word mappings")
         print(f"🧠 Using multilingual sentence transformer for semantic search")
     
-    def _load_or_create_embeddings(self):
-        """Load embeddings from file or create new ones"""
+    # Read-only views of the current index version
+    @property
+    def chunks(self):
+        return self.index.chunks
+    
+    @property
+    def embeddings(self):
+        return self.index.embeddings
+    
+    @property
+    def vector_index(self):
+        return self.index.vector_index
+    
+    @property
+    def keyword_index(self):
+        return self.index.keyword_index
+    
+    def _build_index(self, version, previous=None):
+        """Build a complete RetrievalIndex from the processed data on disk"""
+        # Load processed data into the compact (memory-mapped) chunk store
+        chunks = ChunkStore.load_or_build(self.processed_data_file, self.chunk_store_dir)
+        
+        # Load or create embeddings
+        embeddings = self._load_or_create_embeddings(chunks, previous)
+        
+        # Read-only search indexes, built once so forked workers can share them
+        return RetrievalIndex(
+            version=version,
+            chunks=chunks,
+            embeddings=embeddings,
+            vector_index=self._build_vector_index(embeddings),
+            keyword_index=KeywordIndex.from_store(chunks),
+            # Precomputed MCQ answers (built offline by answer_bank.py), if present
+            # (ignored when it was built against other content)
+            answer_bank=(AnswerBank.load(self.answer_bank_file, chunks.fingerprint)
+                         if os.path.exists(self.answer_bank_file) else None)
+        )
+    
+    @property
+    def reloading(self):
+        return self._reload_lock.locked()
+    
+    def reload(self):
+        """Rebuild the index from disk and swap it in; in-flight queries finish on the old version.
+        
+        Returns the new version number, or None when a reload is already running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return None
+        try:
+            previous = self.index
+            print(f"🔄 Rebuilding index (current version {previous.version})...")
+            new_index = self._build_index(version=previous.version + 1, previous=previous)
+            
+            # Single reference assignment: atomic for every thread reading self.index
+            self.index = new_index
+            print(f"✅ Index version {new_index.version} live with {len(new_index.chunks)} chunks")
+            
+            for listener in self.reload_listeners:
+                listener(new_index)
+            return new_index.version
+        finally:
+            self._reload_lock.release()
+    
+    def _load_or_create_embeddings(self, chunks, previous=None):
+        """Load embeddings from file or create new ones (reusing unchanged chunks from a previous index)"""
         if os.path.exists(self.embeddings_file):
             print("📁 Loading existing embeddings...")
             with open(self.embeddings_file, 'rb') as f:
-                embeddings = pickle.load(f)
-            print(f"✅ Loaded {len(embeddings)} embeddings from cache")
-            return embeddings
-        else:
-            print("🔄 Creating new embeddings... (this may take a moment)")
-            texts = [chunk['text'] for chunk in self.chunks]
-            embeddings = self.encoder.encode(texts, show_progress_bar=True)
-            
-            # Save embeddings for future use
-            with open(self.embeddings_file, 'wb') as f:
-                pickle.dump(embeddings, f)
-            print(f"💾 Saved {len(embeddings)} embeddings to cache")
-            return embeddings
+                cached = pickle.load(f)
+            # A legacy cache without a fingerprint cannot be validated, so it is treated as a miss;
+            # vectors from another model are incompatible with the query encoder
+            if (isinstance(cached, dict) and cached.get('fingerprint') == chunks.fingerprint
+                    and cached.get('model') == EMBEDDING_MODEL_NAME):
+                embeddings = cached['embeddings']
+                print(f"✅ Loaded {len(embeddings)} embeddings from cache")
+                return embeddings
+            print("⚠️ Cached embeddings do not match the current chunks or model, re-encoding")
+        
+        if previous is None:
+            # No earlier version to reuse: run the (checkpointed) builder.
+            # For large corpora run `python build_embeddings.py --workers N` before starting.
+            print("🔄 Creating new embeddings... (this may take a moment; see build_embeddings.py)")
+            return build_embeddings(chunks, self.embeddings_file, workers=1,
+                                    encoder=None if self.isolate_inference else self.encoder)
+        
+        # Only encode chunks whose text is new since the previous version
+        print("🔄 Updating embeddings for changed chunks...")
+        texts = chunks.texts()
+        known = {text: row for row, text in enumerate(previous.chunks.texts())}
+        missing = [i for i, text in enumerate(texts) if text not in known]
+        embeddings = np.zeros((len(texts), previous.embeddings.shape[1]), dtype=np.float32)
+        for i, text in enumerate(texts):
+            if text in known:
+                embeddings[i] = previous.embeddings[known[text]]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            if self.isolate_inference:
+                embeddings[missing] = encode_in_subprocess(missing_texts)
+            else:
+                embeddings[missing] = self.encoder.encode(missing_texts, batch_size=64, show_progress_bar=True)
+        print(f"♻️ Reused {len(texts) - len(missing)} embeddings, encoded {len(missing)} new chunks")
+        
+        # Save embeddings for future use (written aside and renamed, so readers never see a partial file)
+        with open(self.embeddings_file + '.tmp', 'wb') as f:
+            pickle.dump({'fingerprint': chunks.fingerprint, 'model': EMBEDDING_MODEL_NAME, 'embeddings': embeddings}, f)
+        os.replace(self.embeddings_file + '.tmp', self.embeddings_file)
+        print(f"💾 Saved {len(embeddings)} embeddings to cache")
+        return embeddings
+    
+    @staticmethod
+    def _build_vector_index(embeddings):
+        """L2-normalized float32 embedding matrix, so cosine similarity is a single dot product"""
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.ascontiguousarray(matrix / np.maximum(norms, 1e-12))
     
     def convert_banglish_to_bangla(self, text):
         """Convert banglish text to bangla for better matching"""
-        # Convert to lowercase for matching
-        lower_text = text.lower()
-        
-        # Replace banglish words with bangla equivalents
-        for banglish_word, bangla_word in self.banglish_mapping.items():
-            # Use word boundaries to avoid partial replacements
-            pattern = r'\b' + re.escape(banglish_word) + r'\b'
-            lower_text = re.sub(pattern, bangla_word, lower_text)
-        
-        return lower_text
+        with stage('transliteration'):
+            # Convert to lowercase for matching
+            lower_text = text.lower()
+            
+            # Replace banglish words with bangla equivalents
+            for banglish_word, bangla_word in self.banglish_mapping.items():
+                # Use word boundaries to avoid partial replacements
+                pattern = r'\b' + re.escape(banglish_word) + r'\b'
+                lower_text = re.sub(pattern, bangla_word, lower_text)
+            
+            return lower_text
     
-    def find_relevant_chunks_vector(self, query, top_k=5):
+    def find_relevant_chunks_vector(self, query, top_k=5, index=None):
         """Find relevant chunks using semantic similarity (vector search)"""
+        index = index or self.index
+        
         # Convert banglish to bangla for better matching
         bangla_query = self.convert_banglish_to_bangla(query)
         
@@ -255,70 +386,74 @@ class BasicBanglaRAG:
         combined_query = f"{query} {bangla_query}"
         
         # Encode the query
-        query_embedding = self.encoder.encode([combined_query])
+        with stage('encode'):
+            query_embedding = self.encoder.encode([combined_query])
         
         # Calculate cosine similarity with all chunk embeddings
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-        
-        # Get top_k most similar chunks
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        with stage('similarity'):
+            query_vector = np.asarray(query_embedding[0], dtype=np.float32)
+            similarities = index.vector_index @ (query_vector / max(np.linalg.norm(query_vector), 1e-12))
+            
+            # Get top_k most similar chunks
+            top_indices = np.argsort(similarities)[::-1][:top_k]
         
         # Return chunks with similarity scores
         relevant_chunks = []
         for idx in top_indices:
             if similarities[idx] > 0.1:  # Minimum similarity threshold
-                relevant_chunks.append({
-                    **self.chunks[idx],
-                    'similarity_score': float(similarities[idx])
-                })
+                relevant_chunks.append(ChunkView(index.chunks, idx, float(similarities[idx])))
         
         return relevant_chunks
     
-    def find_relevant_chunks_basic(self, query, top_k=5):
+    def find_relevant_chunks_basic(self, query, top_k=5, index=None):
         """Find relevant chunks using simple keyword matching with banglish support"""
+        index = index or self.index
+        
         # Convert banglish to bangla for better matching
         bangla_query = self.convert_banglish_to_bangla(query)
         
         # Use both original and converted query for matching
         query_words = query.lower().split() + bangla_query.split()
         
-        scored_chunks = []
-        for chunk in self.chunks:
-            text = chunk['text'].lower()
-            score = 0
+        with stage('keyword'):
+            # Per-chunk scores for all chunks at once: one scan of the index per query word
+            scores = np.zeros(len(index.keyword_index), dtype=np.int64)
             
             # Simple keyword matching
             for word in query_words:
                 if len(word) > 2:  # Only consider words longer than 2 characters
-                    score += text.count(word)
+                    scores += index.keyword_index.counts(word.encode('utf-8'))
             
             # Bonus points for exact phrase matches
-            if bangla_query.strip() in text:
-                score += 5
+            scores += 5 * (index.keyword_index.counts(bangla_query.strip().encode('utf-8')) > 0)
             
-            if score > 0:
-                scored_chunks.append({
-                    'chunk': chunk,
-                    'score': score
-                })
+            scored_chunks = [
+                {'chunk': index.chunks[position], 'score': int(scores[position])}
+                for position in np.flatnonzero(scores)
+            ]
         
         # Sort by score and return top_k
         scored_chunks.sort(key=lambda x: x['score'], reverse=True)
-        return [item['chunk'] for item in scored_chunks[:top_k]]
+        return [item['chunk'].with_score(item['score']) for item in scored_chunks[:top_k]]
     
-    def find_relevant_chunks_hybrid(self, query, top_k=5):
+    def find_relevant_chunks_hybrid(self, query, top_k=5, index=None):
         """Hybrid search combining vector similarity and keyword matching"""
-        # Get results from both methods
-        vector_chunks = self.find_relevant_chunks_vector(query, top_k=top_k*2)
-        keyword_chunks = self.find_relevant_chunks_basic(query, top_k=top_k*2)
+        index = index or self.index
         
+        # Get results from both methods
+        vector_chunks = self.find_relevant_chunks_vector(query, top_k=top_k*2, index=index)
+        keyword_chunks = self.find_relevant_chunks_basic(query, top_k=top_k*2, index=index)
+        return self._fuse_results(vector_chunks, keyword_chunks, top_k)
+    
+    def _fuse_results(self, vector_chunks, keyword_chunks, top_k=5):
+        """Combine vector and keyword result lists into one hybrid ranking"""
         # Combine and score
         combined_chunks = {}
         
         # Add vector results with similarity scores
         for i, chunk in enumerate(vector_chunks):
             chunk_id = chunk['id']
-            score = chunk.get('similarity_score', 0) * 100  # Scale up similarity
+            score = (chunk.score or 0) * 100  # Scale up similarity
             combined_chunks[chunk_id] = {
                 'chunk': chunk,
                 'vector_score': score,
@@ -361,10 +496,10 @@ class BasicBanglaRAG:
         
         # Sort by final score and return top_k
         final_chunks.sort(key=lambda x: x['final_score'], reverse=True)
-        return [item['chunk'] for item in final_chunks[:top_k]]
+        return [item['chunk'].with_score(item['final_score']) for item in final_chunks[:top_k]]
     
-    def generate_answer(self, query, relevant_chunks, conversation_history=None):
-        """Generate answer using OpenAI with relevant context, banglish support, and conversation memory"""
+    def _build_messages(self, query, relevant_chunks, conversation_history=None):
+        """Build the chat messages (prompt) for a query with its retrieved context"""
         
         # Detect if query is banglish (mixed English-Bengali romanized)
         is_banglish = self.is_banglish_query(query)
@@ -428,16 +563,23 @@ Instructions:
 
 Answer:"""
 
+        return [
+            {"role": "system", "content": "You are a helpful assistant for Bangla literature education with support for Banglish (romanized Bengali) and conversation memory."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def generate_answer(self, query, relevant_chunks, conversation_history=None):
+        """Generate answer using OpenAI with relevant context, banglish support, and conversation memory"""
+        messages = self._build_messages(query, relevant_chunks, conversation_history)
+
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant for Bangla literature education with support for Banglish (romanized Bengali) and conversation memory."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=800,
-                temperature=0.3
-            )
+            with stage('llm'):
+                response = self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    max_tokens=800,
+                    temperature=0.3
+                )
             
             # Ensure we have a valid response
             answer = response.choices[0].message.content
@@ -450,6 +592,29 @@ Answer:"""
             print(f"❌ OpenAI API Error: {str(e)}")
             return f"দুঃখিত, একটি ত্রুটি ঘটেছে: {str(e)}"
     
+    def generate_answer_stream(self, query, relevant_chunks, conversation_history=None):
+        """Stream the answer from OpenAI piece by piece"""
+        messages = self._build_messages(query, relevant_chunks, conversation_history)
+        
+        try:
+            # Covers the whole stream, including the time the consumer spends between tokens
+            with stage('llm'):
+                stream = self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    max_tokens=800,
+                    temperature=0.3,
+                    stream=True
+                )
+                
+                for event in stream:
+                    if event.choices and event.choices[0].delta.content:
+                        yield event.choices[0].delta.content
+                    
+        except Exception as e:
+            print(f"❌ OpenAI API Error: {str(e)}")
+            yield f"দুঃখিত, একটি ত্রুটি ঘটেছে: {str(e)}"
+    
     def is_banglish_query(self, text):
         """Detect if the query is written in banglish (romanized Bengali)"""
         # Check if text contains romanized Bengali words
@@ -463,8 +628,71 @@ Answer:"""
         # If more than 1 banglish word detected, consider it banglish
         return banglish_count > 0
     
-    def query(self, question, search_method='hybrid', conversation_history=None):
-        """Main query method with vector-based, hybrid search, and conversation memory support"""
+    def retrieve(self, question, search_method='hybrid', top_k=5):
+        """Find relevant chunks using the specified search method"""
+        return self.plan_retrieval(question, search_method, top_k=top_k, use_answer_bank=False).chunks
+    
+    def plan_retrieval(self, question, search_method='hybrid', conversation_history=None, top_k=5,
+                       use_answer_bank=True):
+        """Retrieve with early exits: returns a RetrievalPlan with the chunks and the strategy used"""
+        # Pin one index version for the whole search, even if a reload swaps it meanwhile
+        index = self.index
+        planner = self.planner
+        
+        # Known question-bank MCQs are answered from the precomputed table
+        if use_answer_bank and index.answer_bank is not None and not conversation_history:
+            with stage('answer_bank'):
+                match = index.answer_bank.lookup(question)
+            if match is not None:
+                print(f"📗 Answer bank match (confidence {match['confidence']})")
+                source = index.chunks.get_by_id(match['source_chunk_id'])
+                chunks = [source.with_score(match['confidence'])] if source is not None else []
+                return RetrievalPlan(chunks, 'answer_bank', match['answer'])
+        candidates = planner.candidate_count(question)
+        
+        if search_method == 'vector':
+            print("🧠 Using vector-based semantic search...")
+            hits = self.find_relevant_chunks_vector(question, top_k=candidates, index=index)
+            return RetrievalPlan(planner.filter_vector_hits(hits)[:top_k], 'vector')
+        
+        if search_method == 'keyword':
+            print("🔍 Using keyword-based search...")
+            hits = self.find_relevant_chunks_basic(question, top_k=top_k, index=index)
+            phrase = self.convert_banglish_to_bangla(question).strip()
+            direct = None
+            if planner.keyword_is_decisive(hits, phrase, index.keyword_index):
+                direct = planner.direct_answer(question, hits[0], phrase, conversation_history)
+            return RetrievalPlan(hits, 'keyword', direct)
+        
+        # hybrid (default): cheapest evidence first, stop once it is decisive
+        print("⚡ Using hybrid search (vector + keyword)...")
+        keyword_hits = self.find_relevant_chunks_basic(question, top_k=candidates, index=index)
+        phrase = self.convert_banglish_to_bangla(question).strip()
+        if planner.keyword_is_decisive(keyword_hits, phrase, index.keyword_index):
+            print("🎯 Strong exact-phrase match, skipping vector search")
+            direct = planner.direct_answer(question, keyword_hits[0], phrase, conversation_history)
+            return RetrievalPlan(keyword_hits[:top_k], 'keyword_exact', direct)
+        
+        vector_hits = planner.filter_vector_hits(
+            self.find_relevant_chunks_vector(question, top_k=candidates, index=index)
+        )
+        if planner.vector_is_decisive(vector_hits):
+            print("🎯 Decisive semantic match, skipping hybrid fusion")
+            return RetrievalPlan(vector_hits[:top_k], 'vector_decisive')
+        
+        return RetrievalPlan(self._fuse_results(vector_hits, keyword_hits, top_k), 'hybrid')
+    
+    def query(self, question, search_method='hybrid', conversation_history=None, include_chunks=True):
+        """Main query method with vector-based, hybrid search, and conversation memory support
+
+        relevant_chunks are returned as compact {id, type, score} records; the chunk
+        text is only attached when include_chunks is True.
+        """
+        # A sampled fraction of queries is profiled (see profiling.py; off by default)
+        with profiler.profile_request('query'):
+            return self._query(question, search_method, conversation_history, include_chunks)
+    
+    def _query(self, question, search_method, conversation_history, include_chunks):
         print(f"🔍 Processing query: {question}")
         
         # Check if it's banglish and show converted query
@@ -477,37 +705,66 @@ Answer:"""
             print(f"🧠 Using conversation memory: {len(conversation_history)} previous exchanges")
         
         # Find relevant chunks using specified method (Long-term memory)
-        if search_method == 'vector':
-            print("🧠 Using vector-based semantic search...")
-            relevant_chunks = self.find_relevant_chunks_vector(question, top_k=5)
-        elif search_method == 'keyword':
-            print("🔍 Using keyword-based search...")
-            relevant_chunks = self.find_relevant_chunks_basic(question, top_k=5)
-        else:  # hybrid (default)
-            print("⚡ Using hybrid search (vector + keyword)...")
-            relevant_chunks = self.find_relevant_chunks_hybrid(question, top_k=5)
+        plan = self.plan_retrieval(question, search_method, conversation_history)
+        relevant_chunks = plan.chunks
         
-        if not relevant_chunks:
+        if not relevant_chunks and not plan.skip_llm:
             return {
-                'answer': "দুঃখিত, এই প্রশ্নের উত্তর খুঁজে পাওয়া যায়নি। অন্য প্রশ্ন করার চেষ্টা করুন।\n\nSorry, answer not found for this question. Try asking differently.",
+                'answer': self.NOT_FOUND_ANSWER,
                 'relevant_chunks': [],
                 'success': False,
                 'search_method': search_method,
                 'used_conversation_memory': bool(conversation_history)
             }
         
-        print(f"📚 Found {len(relevant_chunks)} relevant chunks")
+        print(f"📚 Found {len(relevant_chunks)} relevant chunks ({plan.strategy})")
         
         # Generate answer with conversation memory (Short-term + Long-term)
-        answer = self.generate_answer(question, relevant_chunks, conversation_history)
+        if plan.skip_llm:
+            print("⚡ Direct lookup answered from the knowledge base, skipping LLM")
+            answer = plan.direct_answer
+        else:
+            answer = self.generate_answer(question, relevant_chunks, conversation_history)
         
         return {
             'answer': answer,
-            'relevant_chunks': [{'text': chunk['text'], 'metadata': chunk} for chunk in relevant_chunks[:3]],
+            'relevant_chunks': [self._chunk_summary(chunk, include_chunks) for chunk in relevant_chunks[:3]],
             'success': True,
             'search_method': search_method,
             'total_chunks_found': len(relevant_chunks),
+            'retrieval_strategy': plan.strategy,
+            'llm_skipped': plan.skip_llm,
             'used_conversation_memory': bool(conversation_history)
         }
+    
+    def query_stream(self, question, search_method='hybrid', conversation_history=None):
+        """Streaming variant of query: yields answer text pieces as they are generated"""
+        with profiler.profile_request('query_stream'):
+            yield from self._query_stream(question, search_method, conversation_history)
+    
+    def _query_stream(self, question, search_method, conversation_history):
+        print(f"🔍 Processing streaming query: {question}")
+        
+        plan = self.plan_retrieval(question, search_method, conversation_history)
+        relevant_chunks = plan.chunks
+        if not relevant_chunks and not plan.skip_llm:
+            yield self.NOT_FOUND_ANSWER
+            return
+        
+        print(f"📚 Found {len(relevant_chunks)} relevant chunks ({plan.strategy})")
+        if plan.skip_llm:
+            yield plan.direct_answer
+            return
+        yield from self.generate_answer_stream(question, relevant_chunks, conversation_history)
 
-
+    @staticmethod
+    def _chunk_summary(chunk, include_text=True):
+        """Compact response record for a retrieved chunk"""
+        summary = {
+            'id': chunk.id,
+            'type': chunk.type,
+            'score': round(float(chunk.score), 4) if chunk.score is not None else None
+        }
+        if include_text:
+            summary['text'] = chunk.text
+        return summary
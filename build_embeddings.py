@@ -0,0 +1,166 @@
+"""Offline embedding builder: length-sorted shards encoded in parallel worker processes.
+
+Chunks are sorted by text length and cut into shards, so every batch holds texts
+of similar length and little padding is wasted. Each finished shard is
+checkpointed to disk, so an interrupted build resumes where it stopped. The
+result is written to the embeddings cache that BasicBanglaRAG loads.
+
+    python build_embeddings.py --workers 4
+"""
+import argparse
+import os
+import pickle
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+import numpy as np
+from dotenv import load_dotenv
+
+from chunk_store import ChunkStore
+
+load_dotenv()
+
+# The one place the model is chosen: the builder and the API both read it, and the
+# cache records it, so a cache built for another model is never loaded
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2')
+
+_worker_encoder = None
+
+
+def _init_worker(model_name, threads):
+    """Load the encoder once per worker process"""
+    global _worker_encoder
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(threads)
+    _worker_encoder = SentenceTransformer(model_name)
+
+
+def _encode_shard(texts, batch_size, path, encoder=None):
+    """Encode one shard and checkpoint it (written aside and renamed, so it is never partial)"""
+    encoder = encoder or _worker_encoder
+    embeddings = np.asarray(encoder.encode(texts, batch_size=batch_size), dtype=np.float32)
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, embeddings)
+    os.replace(path + '.tmp', path)
+    return len(texts)
+
+
+def _encode_texts(texts, batch_size):
+    return np.asarray(_worker_encoder.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+
+def _spawn_pool(workers, model_name):
+    """Encoder worker processes; spawned, since torch and tokenizer thread pools do not survive fork"""
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker, initargs=(model_name, threads))
+
+
+def encode_in_subprocess(texts, model_name=EMBEDDING_MODEL_NAME, batch_size=64):
+    """Encode texts in a spawned process, keeping torch inference out of a process that later forks"""
+    with _spawn_pool(1, model_name) as pool:
+        return pool.submit(_encode_texts, list(texts), batch_size).result()
+
+
+def plan_shards(store, shard_size):
+    """Chunk positions sorted by UTF-8 length (read straight from the offsets), cut into shards"""
+    lengths = np.diff(np.asarray(store.offsets))
+    order = np.argsort(lengths, kind='stable')
+    return [order[start:start + shard_size] for start in range(0, len(order), shard_size)]
+
+
+def build_embeddings(store, output_file='embeddings.pkl', workers=1, shard_size=256, batch_size=64,
+                     checkpoint_root='embeddings_build', model_name=EMBEDDING_MODEL_NAME, encoder=None,
+                     keep_checkpoints=False):
+    """Encode every chunk in the store and write the embeddings cache; returns the embedding matrix.
+
+    With an encoder the shards are encoded in this process; otherwise in `workers` spawned processes.
+    """
+    shards = plan_shards(store, shard_size)
+    # Shards are only reusable for the same content, model and sharding
+    model_slug = re.sub(r'[^\w.-]+', '_', model_name)
+    checkpoint_dir = os.path.join(checkpoint_root, f"{store.fingerprint[:16]}-{model_slug}-{shard_size}")
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    shard_path = lambda number: os.path.join(checkpoint_dir, f"shard_{number:05d}.npy")
+
+    pending = [number for number in range(len(shards)) if not os.path.exists(shard_path(number))]
+    total = len(store)
+    done = total - sum(len(shards[number]) for number in pending)
+    if done:
+        print(f"♻️ Resuming: {done}/{total} chunks already encoded")
+    print(f"🔄 Encoding {total - done} chunks in {len(pending)} shards with {workers} worker(s)...")
+
+    start = time.time()
+    encoded = 0
+
+    def report(count):
+        nonlocal encoded
+        encoded += count
+        elapsed = max(time.time() - start, 1e-9)
+        print(f"📈 {done + encoded}/{total} chunks ({encoded / elapsed:.1f} chunks/s)")
+
+    if encoder is not None:
+        # Caller's encoder, in this process
+        for number in pending:
+            texts = [store.text(i) for i in shards[number]]
+            report(_encode_shard(texts, batch_size, shard_path(number), encoder))
+    elif pending:
+        # Worker processes only: this process never runs inference itself
+        with _spawn_pool(max(1, workers), model_name) as pool:
+            futures = [
+                pool.submit(_encode_shard, [store.text(i) for i in shards[number]], batch_size, shard_path(number))
+                for number in pending
+            ]
+            for future in as_completed(futures):
+                report(future.result())
+
+    # Reassemble the shards in the original chunk order
+    embeddings = None
+    for number, positions in enumerate(shards):
+        shard = np.load(shard_path(number))
+        if embeddings is None:
+            embeddings = np.zeros((total, shard.shape[1]), dtype=np.float32)
+        embeddings[positions] = shard
+
+    with open(output_file + '.tmp', 'wb') as f:
+        pickle.dump({'fingerprint': store.fingerprint, 'model': model_name, 'embeddings': embeddings}, f)
+    os.replace(output_file + '.tmp', output_file)
+    if not keep_checkpoints:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+    elapsed = time.time() - start
+    print(f"💾 Saved {total} embeddings to {output_file} "
+          f"({encoded} encoded in {elapsed:.1f}s, {encoded / max(elapsed, 1e-9):.1f} chunks/s)")
+    return embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the chunk embeddings offline, in parallel")
+    parser.add_argument('--data', default='processed_data.json')
+    parser.add_argument('--chunk-store', default='chunk_store')
+    parser.add_argument('--output', default='embeddings.pkl')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shard-size', type=int, default=256)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--checkpoint-dir', default='embeddings_build')
+    parser.add_argument('--keep-checkpoints', action='store_true')
+    args = parser.parse_args()
+
+    store = ChunkStore.load_or_build(args.data, args.chunk_store)
+    build_embeddings(
+        store,
+        output_file=args.output,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        batch_size=args.batch_size,
+        checkpoint_root=args.checkpoint_dir,
+        keep_checkpoints=args.keep_checkpoints,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class ChunkView(Mapping):
+    """Read-only view of one chunk inside a ChunkStore (behaves like the old chunk dict)"""
+
+    __slots__ = ('_store', 'index', 'score')
+
+    def __init__(self, store: 'ChunkStore', index: int, score: Optional[float] = None):
+        self._store = store
+        self.index = index
+        self.score = score
+
+    @property
+    def id(self) -> int:
+        return int(self._store.ids[self.index])
+
+    @property
+    def type(self) -> str:
+        return self._store.type_of(self.index)
+
+    @property
+    def text(self) -> str:
+        return self._store.text(self.index)
+
+    def text_bytes(self) -> memoryview:
+        """Raw UTF-8 bytes of the chunk text without copying"""
+        return self._store.text_bytes(self.index)
+
+    def with_score(self, score: float) -> 'ChunkView':
+        return ChunkView(self._store, self.index, score)
+
+    def to_dict(self) -> Dict:
+        return dict(self)
+
+    def _keys(self):
+        return ('id', 'text', 'type', 'similarity_score') if self.score is not None else ('id', 'text', 'type')
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return self.id
+        if key == 'text':
+            return self.text
+        if key == 'type':
+            return self.type
+        if key == 'similarity_score' and self.score is not None:
+            return self.score
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return f"ChunkView(id={self.id}, type={self.type!r}, score={self.score})"
+
+
+class ChunkStore:
+    """Columnar chunk storage: one UTF-8 text buffer + offsets, typed id/type arrays.
+
+    On disk each version of the store is a directory of .npy files that are
+    memory-mapped on load, so several processes reading the same store share the
+    pages through the OS cache. A CURRENT file names the live version.
+    """
+
+    TEXT_FILE = 'text.npy'
+    OFFSETS_FILE = 'offsets.npy'
+    IDS_FILE = 'ids.npy'
+    TYPES_FILE = 'types.npy'
+    META_FILE = 'meta.json'
+    CURRENT_FILE = 'CURRENT'
+
+    def __init__(self, text_buffer: np.ndarray, offsets: np.ndarray, ids: np.ndarray,
+                 type_codes: np.ndarray, type_names: List[str], fingerprint: Optional[str] = None):
+        self.text_buffer = text_buffer
+        self.offsets = offsets
+        self.ids = ids
+        self.type_codes = type_codes
+        self.type_names = list(type_names)
+        self.fingerprint = fingerprint or self._compute_fingerprint()
+        self._id_to_index = None
+
+    def _compute_fingerprint(self) -> str:
+        """Content hash of the chunk texts, used to detect stale embeddings"""
+        digest = hashlib.sha1()
+        digest.update(np.ascontiguousarray(self.offsets, dtype=np.int64).tobytes())
+        digest.update(np.ascontiguousarray(self.text_buffer).tobytes())
+        return digest.hexdigest()
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict]) -> 'ChunkStore':
+        """Build a store from the list of chunk dicts produced by text_processor.py"""
+        encoded = [chunk['text'].encode('utf-8') for chunk in chunks]
+        offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        if encoded:
+            offsets[1:] = np.cumsum([len(b) for b in encoded])
+        text_buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+        type_names = sorted({chunk.get('type', 'explanation') for chunk in chunks})
+        type_lookup = {name: code for code, name in enumerate(type_names)}
+        ids = np.array([chunk['id'] for chunk in chunks], dtype=np.int32)
+        type_codes = np.array([type_lookup[chunk.get('type', 'explanation')] for chunk in chunks], dtype=np.uint8)
+        return cls(text_buffer, offsets, ids, type_codes, type_names)
+
+    @classmethod
+    def from_json(cls, processed_data_file: str) -> 'ChunkStore':
+        with open(processed_data_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls.from_chunks(data['chunks'])
+
+    def save(self, directory: str) -> str:
+        """Write the store as memory-mappable .npy files in a new version directory.
+
+        Files of a store that is memory-mapped are never overwritten (Windows does not
+        allow replacing them): each version gets its own directory, which is published
+        by atomically replacing the small CURRENT pointer file. Returns that directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        current = self._current_version(directory)
+        if current and self._read_meta(current).get('fingerprint') == self.fingerprint:
+            # Same content: keep the existing files, just mark the store as up to date
+            self._publish(directory, current)
+            return current
+
+        name = f"v{int(time.time() * 1000)}-{self.fingerprint[:12]}"
+        staging = os.path.join(directory, f".{name}.tmp")
+        os.makedirs(staging)
+        arrays = [
+            (self.TEXT_FILE, self.text_buffer),
+            (self.OFFSETS_FILE, self.offsets),
+            (self.IDS_FILE, self.ids),
+            (self.TYPES_FILE, self.type_codes),
+        ]
+        for file_name, array in arrays:
+            np.save(os.path.join(staging, file_name), np.ascontiguousarray(array))
+        with open(os.path.join(staging, self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'total_chunks': len(self),
+                'type_names': self.type_names,
+                'fingerprint': self.fingerprint
+            }, f, ensure_ascii=False, indent=2)
+
+        version_dir = os.path.join(directory, name)
+        os.rename(staging, version_dir)
+        self._publish(directory, name)
+
+        # Best effort: versions still mapped on Windows are removed on a later save
+        for entry in os.listdir(directory):
+            if entry not in (name, self.CURRENT_FILE):
+                path = os.path.join(directory, entry)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        return version_dir
+
+    @classmethod
+    def _publish(cls, directory: str, name: str):
+        """Point CURRENT at a version directory; its mtime marks the store as up to date"""
+        pointer = os.path.join(directory, cls.CURRENT_FILE)
+        with open(pointer + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(os.path.basename(name))
+        os.replace(pointer + '.tmp', pointer)
+
+    @classmethod
+    def _current_version(cls, directory: str) -> Optional[str]:
+        try:
+            with open(os.path.join(directory, cls.CURRENT_FILE), 'r', encoding='utf-8') as f:
+                name = f.read().strip()
+        except OSError:
+            return None
+        version_dir = os.path.join(directory, name)
+        return version_dir if name and os.path.exists(os.path.join(version_dir, cls.META_FILE)) else None
+
+    @classmethod
+    def _read_meta(cls, version_dir: str) -> Dict:
+        with open(os.path.join(version_dir, cls.META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'ChunkStore':
+        """Load the version CURRENT points at"""
+        version_dir = cls._current_version(directory)
+        if version_dir is None:
+            raise FileNotFoundError(f"No chunk store in {directory}")
+        mmap_mode = 'r' if mmap else None
+        meta = cls._read_meta(version_dir)
+        return cls(
+            np.load(os.path.join(version_dir, cls.TEXT_FILE), mmap_mode=mmap_mode),
+            np.load(os.path.join(version_dir, cls.OFFSETS_FILE), mmap_mode=mmap_mode),
+            np.load(os.path.join(version_dir, cls.IDS_FILE), mmap_mode=mmap_mode),
+            np.load(os.path.join(version_dir, cls.TYPES_FILE), mmap_mode=mmap_mode),
+            meta['type_names'],
+            meta.get('fingerprint'),
+        )
+
+    @classmethod
+    def load_or_build(cls, processed_data_file: str, directory: str) -> 'ChunkStore':
+        """Load the on-disk store, rebuilding it when the JSON source is newer"""
+        pointer = os.path.join(directory, cls.CURRENT_FILE)
+        if cls._current_version(directory) and (
+            not os.path.exists(processed_data_file)
+            or os.path.getmtime(pointer) >= os.path.getmtime(processed_data_file)
+        ):
+            print(f"📁 Loading chunk store from {directory}...")
+            return cls.load(directory)
+
+        print(f"🔄 Building chunk store from {processed_data_file}...")
+        cls.from_json(processed_data_file).save(directory)
+        return cls.load(directory)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index) -> ChunkView:
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return ChunkView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ChunkView(self, index)
+
+    def text_bytes(self, index: int) -> memoryview:
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return memoryview(self.text_buffer[start:end])
+
+    def text(self, index: int) -> str:
+        return str(self.text_bytes(index), 'utf-8')
+
+    def texts(self) -> List[str]:
+        return [self.text(i) for i in range(len(self))]
+
+    def type_of(self, index: int) -> str:
+        return self.type_names[self.type_codes[index]]
+
+    def index_of(self, chunk_id: int) -> int:
+        """Position of a chunk id in the store (ids are usually 0..n-1)"""
+        if self._id_to_index is None:
+            self._id_to_index = {int(chunk_id): i for i, chunk_id in enumerate(self.ids)}
+        return self._id_to_index[int(chunk_id)]
+
+    def get_by_id(self, chunk_id: int) -> Optional[ChunkView]:
+        try:
+            return ChunkView(self, self.index_of(chunk_id))
+        except KeyError:
+            return None
+
+
+class KeywordIndex:
+    """Lowercased chunk texts as one UTF-8 blob + offsets, for substring keyword search.
+
+    The blob is a single bytes object, so scanning it only touches that object's
+    refcount (one page) instead of one str per chunk; after fork the text pages
+    stay shared between workers. UTF-8 is self-synchronizing, so a byte-level
+    substring match is exactly a match on the decoded text.
+    """
+
+    SEPARATOR = b'\x00'  # ends every chunk, so no match can span two chunks
+
+    def __init__(self, blob: bytes, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_store(cls, store: ChunkStore) -> 'KeywordIndex':
+        # Lowercasing can change the byte length of non-Bangla text, so offsets are recomputed
+        encoded = [store.text(i).lower().encode('utf-8') + cls.SEPARATOR for i in range(len(store))]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            offsets[1:] = np.cumsum([len(b) for b in encoded])
+        return cls(b''.join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def counts(self, needle: bytes) -> np.ndarray:
+        """Non-overlapping occurrences of needle (UTF-8) in every chunk, as one array"""
+        counts = np.zeros(len(self), dtype=np.int64)
+        if not needle:
+            return counts
+        positions = []
+        position = self.blob.find(needle)
+        while position >= 0:
+            positions.append(position)
+            position = self.blob.find(needle, position + len(needle))
+        if positions:
+            chunks = np.searchsorted(self.offsets, positions, side='right') - 1
+            counts += np.bincount(chunks, minlength=len(self))
+        return counts
+
+    def contains(self, index: int, needle: bytes) -> bool:
+        return self.blob.find(needle, int(self.offsets[index]), int(self.offsets[index + 1])) >= 0
+
+
+if __name__ == "__main__":
+    store = ChunkStore.from_json('processed_data.json')
+    store.save('chunk_store')
+    print(f"✅ Chunk store written to chunk_store/ ({len(store)} chunks, {store.text_buffer.nbytes} bytes of text)")
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import json
+import re
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different submissions share a key"""
+    text = question.casefold().strip()
+    text = re.sub(r'\s+', ' ', text)
+    return text.rstrip('?।!. ')
+
+
+def history_fingerprint(conversation_history: Optional[List[Dict[str, Any]]]) -> str:
+    """Fingerprint of the part of the history that reaches the prompt (last 3 exchanges)"""
+    if not conversation_history:
+        return ''
+    recent = [
+        (str(conv.get('question', '')), str(conv.get('answer', ''))[:100])
+        for conv in conversation_history[-3:]
+    ]
+    payload = json.dumps(recent, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def request_key(question: str, search_method: str, conversation_history=None) -> str:
+    return f"{search_method}|{history_fingerprint(conversation_history)}|{normalize_question(question)}"
+
+
+class StreamBroadcast:
+    """Buffers the pieces of one streamed answer and replays them to every subscriber"""
+
+    def __init__(self):
+        self.pieces: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def push(self, piece: str):
+        self.pieces.append(piece)
+        self._wake()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.done = True
+        self.error = error
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            while position < len(self.pieces):
+                yield self.pieces[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class SingleFlight:
+    """Deduplicates identical in-flight requests so they share one computation.
+
+    Blocking work runs in the default thread pool; all bookkeeping happens on the
+    event loop thread, so no locks are needed.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, StreamBroadcast] = {}
+        self.metrics = {
+            'requests': 0,
+            'executions': 0,
+            'coalesced': 0,
+            'stream_requests': 0,
+            'stream_executions': 0,
+            'stream_coalesced': 0,
+        }
+
+    async def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn once per key; concurrent callers with the same key await the same result"""
+        self.metrics['requests'] += 1
+        future = self._calls.get(key)
+        if future is not None:
+            self.metrics['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        # The executor future is shielded for every caller, so a disconnecting
+        # client cannot cancel the computation the others are waiting on
+        future = asyncio.get_running_loop().run_in_executor(None, fn)
+        self._calls[key] = future
+        self.metrics['executions'] += 1
+        future.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(future)
+
+    def stream(self, key: str, producer: Callable[[], Iterator[str]]) -> AsyncIterator[str]:
+        """Fan out one streamed computation per key to every concurrent subscriber"""
+        self.metrics['stream_requests'] += 1
+        broadcast = self._streams.get(key)
+        if broadcast is not None:
+            self.metrics['stream_coalesced'] += 1
+            return broadcast.subscribe()
+
+        loop = asyncio.get_running_loop()
+        broadcast = StreamBroadcast()
+        self._streams[key] = broadcast
+        self.metrics['stream_executions'] += 1
+
+        def finish(error=None):
+            self._streams.pop(key, None)
+            broadcast.finish(error)
+
+        def run():
+            # Runs in a worker thread; it keeps going even if the first client disconnects
+            try:
+                for piece in producer():
+                    loop.call_soon_threadsafe(broadcast.push, piece)
+            except Exception as e:
+                loop.call_soon_threadsafe(finish, e)
+            else:
+                loop.call_soon_threadsafe(finish)
+
+        loop.run_in_executor(None, run)
+        return broadcast.subscribe()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.metrics,
+            'in_flight': len(self._calls),
+            'streams_in_flight': len(self._streams),
+        }
@@ -119,7 +119,8 @@ function App() {
       const response = await axios.post<ApiResponse>(`${API_BASE_URL}/api/query`, {
         question: question.trim(),
         search_method: searchMethod,
-        conversation_history: conversationHistory
+        conversation_history: conversationHistory,
+        include_chunks: true
       });
 
       const result = response.data;
@@ -0,0 +1,64 @@
+import os
+import threading
+from typing import Callable, List, Optional
+
+
+class IndexFileWatcher:
+    """Polls source files and triggers a reload when one of them changes.
+
+    Polling keeps this dependency-free and works the same on Windows and Linux;
+    a change is only acted on once the file's mtime has been stable for one
+    interval, so a half-written processed_data.json is never picked up. Either
+    start() a polling thread that calls on_change, or call poll() from a loop.
+    """
+
+    def __init__(self, paths: List[str], on_change: Optional[Callable[[], None]] = None, interval: float = 10.0):
+        self.paths = paths
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._seen = self._snapshot()
+        self._pending = None
+
+    def _snapshot(self):
+        mtimes = {}
+        for path in self.paths:
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def poll(self) -> bool:
+        """Check the files once; True when a change has settled and should be acted on"""
+        current = self._snapshot()
+        if current == self._seen:
+            self._pending = None
+            return False
+        if current != self._pending:
+            # Changed since the last poll: wait one more interval for writes to settle
+            self._pending = current
+            return False
+        self._seen = current
+        self._pending = None
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.poll():
+                continue
+            print(f"👀 Source files changed, reloading index...")
+            try:
+                self.on_change()
+            except Exception as e:
+                print(f"❌ Index reload failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='index-file-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
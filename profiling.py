@@ -0,0 +1,204 @@
+"""Opt-in profiling for the query path.
+
+- Per-request sampling: PROFILE_SAMPLE_RATE (0..1) of BasicBanglaRAG.query calls run
+  under cProfile, with wall time per stage (transliteration, encode, similarity,
+  keyword, llm) and, with PROFILE_TRACE_MEMORY=1, tracemalloc allocation deltas
+  (tracemalloc only runs while a sampled request does).
+- Time-boxed capture: SamplingProfiler samples the stacks of every thread and
+  exports them as a speedscope file or as collapsed stacks for flamegraph.pl.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current profiled request; a no-op when none is active"""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    memory_before = tracemalloc.get_traced_memory()[0] if profile.trace_memory else 0
+    try:
+        yield
+    finally:
+        totals = profile.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'allocated_kb': 0.0})
+        totals['seconds'] += time.perf_counter() - start
+        totals['calls'] += 1
+        if profile.trace_memory:
+            # tracemalloc is process-wide, so concurrent requests add some noise here
+            totals['allocated_kb'] += (tracemalloc.get_traced_memory()[0] - memory_before) / 1024
+
+
+class RequestProfile:
+    def __init__(self, name: str, trace_memory: bool):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict] = {}
+        self.started_at = datetime.now().isoformat()
+        self.seconds = 0.0
+        self.peak_memory_kb = None
+        self.top_functions = ''
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'seconds': round(self.seconds, 4),
+            'stages': {
+                name: {key: round(value, 4) if isinstance(value, float) else value for key, value in totals.items()}
+                for name, totals in self.stages.items()
+            },
+            'peak_memory_kb': self.peak_memory_kb,
+            'top_functions': self.top_functions,
+        }
+
+
+class RequestProfiler:
+    """Profiles a sampled fraction of requests and keeps the most recent results"""
+
+    def __init__(self, sample_rate: float = 0.0, trace_memory: bool = False, keep: int = 50):
+        self.sample_rate = sample_rate
+        self.trace_memory = trace_memory
+        self.recent = deque(maxlen=keep)
+        # cProfile can only profile one thread at a time (and Python 3.12+ allows a
+        # single active profiler per process), so concurrent samples are skipped
+        self._cprofile_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'RequestProfiler':
+        return cls(
+            sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', '0')),
+            trace_memory=os.getenv('PROFILE_TRACE_MEMORY', '0') == '1',
+        )
+
+    @contextmanager
+    def profile_request(self, name: str):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate \
+                or getattr(_local, 'profile', None) is not None \
+                or not self._cprofile_lock.acquire(blocking=False):
+            yield None
+            return
+
+        profile = RequestProfile(name, self.trace_memory)
+        # Trace only for the duration of this sampled request: tracemalloc slows down every
+        # allocation in the process while it is on (unless someone else already turned it on)
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        _local.profile = profile
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield profile
+        finally:
+            profiler.disable()
+            profile.seconds = time.perf_counter() - start
+            if self.trace_memory:
+                profile.peak_memory_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            if started_tracing:
+                tracemalloc.stop()
+            # Released only after tracing stopped, so the next sample starts it afresh
+            self._cprofile_lock.release()
+            _local.profile = None
+
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(20)
+            profile.top_functions = output.getvalue()
+            self.recent.append(profile)
+
+    def recent_profiles(self) -> List[Dict]:
+        return [profile.to_dict() for profile in self.recent]
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler over all threads, for time-boxed captures"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.frames: List[Dict] = []
+        self._frame_ids: Dict = {}
+        self.samples: Dict[str, List[List[int]]] = {}
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        if key not in self._frame_ids:
+            self._frame_ids[key] = len(self.frames)
+            self.frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+        return self._frame_ids[key]
+
+    def capture(self, seconds: float) -> 'SamplingProfiler':
+        own_thread = threading.get_ident()
+        names = {}
+        self.started = time.perf_counter()
+        deadline = self.started + seconds
+        while time.perf_counter() < deadline:
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.setdefault(names.get(thread_id, str(thread_id)), []).append(stack)
+            time.sleep(self.interval)
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def to_speedscope(self, name: str = 'query path') -> Dict:
+        profiles = []
+        for thread_name, stacks in self.samples.items():
+            weight = self.duration / max(len(stacks), 1)
+            profiles.append({
+                'type': 'sampled',
+                'name': thread_name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': self.duration,
+                'samples': stacks,
+                'weights': [weight] * len(stacks),
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'profiling.py',
+            'shared': {'frames': self.frames},
+            'profiles': profiles,
+        }
+
+    def to_collapsed(self) -> str:
+        """Brendan Gregg's collapsed stack format (input for flamegraph.pl / speedscope)"""
+        counts = {}
+        for thread_name, stacks in self.samples.items():
+            for stack in stacks:
+                parts = [thread_name] + [
+                    f"{self.frames[i]['name']} ({os.path.basename(self.frames[i]['file'])}:{self.frames[i]['line']})"
+                    for i in stack
+                ]
+                line = ';'.join(parts)
+                counts[line] = counts.get(line, 0) + 1
+        return '\n'.join(f"{line} {count}" for line, count in sorted(counts.items())) + '\n'
+
+
+# Process-wide request profiler, configured from the environment
+profiler = RequestProfiler.from_env()
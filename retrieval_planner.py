@@ -0,0 +1,121 @@
+import re
+from typing import List, Optional
+
+from answer_bank import OPTION_LETTERS, parse_mcqs
+from coalescing import normalize_question
+
+# Visible breaks between glossary entries in the OCR text (sentence end, table rule, wide gap)
+ENTRY_DELIMITER = re.compile(r'[।;|\n]|\s{2,}')
+
+
+class RetrievalPlan:
+    """Outcome of a planned retrieval: the chunks to use and how they were found"""
+
+    def __init__(self, chunks, strategy: str, direct_answer: Optional[str] = None):
+        self.chunks = chunks
+        self.strategy = strategy
+        self.direct_answer = direct_answer
+
+    @property
+    def skip_llm(self) -> bool:
+        return self.direct_answer is not None
+
+
+class RetrievalPlanner:
+    """Decides how much retrieval work a question needs.
+
+    The hybrid pipeline runs cheapest-first and stops as soon as the evidence is
+    decisive:
+      1. keyword search; a strong, discriminative exact-phrase hit ends retrieval
+         without encoding the query at all
+      2. vector search; a decisive similarity margin skips keyword fusion
+      3. full hybrid fusion of both candidate lists
+    Direct lookups answered verbatim by the single exact hit skip the LLM: an MCQ
+    whose printed answer key belongs to the stem the question restates, or a
+    clearly delimited glossary entry.
+    """
+
+    def __init__(self, context_size=3, min_similarity=0.1, relative_similarity=0.5,
+                 vector_margin=0.15, keyword_margin=1.5, min_phrase_length=4, max_direct_words=6,
+                 max_entry_words=8, min_stem_coverage=0.9):
+        self.context_size = context_size  # chunks that actually reach the prompt
+        self.min_similarity = min_similarity
+        self.relative_similarity = relative_similarity
+        self.vector_margin = vector_margin
+        self.keyword_margin = keyword_margin
+        self.min_phrase_length = min_phrase_length
+        self.max_direct_words = max_direct_words
+        self.max_entry_words = max_entry_words
+        self.min_stem_coverage = min_stem_coverage
+
+    def candidate_count(self, question: str) -> int:
+        """Short, vague questions need a wider candidate pool than long, specific ones"""
+        words = len(question.split())
+        if words <= 2:
+            return self.context_size * 3
+        if words <= 5:
+            return self.context_size * 2
+        return self.context_size + 2
+
+    def filter_vector_hits(self, hits: List) -> List:
+        """Drop hits far below the best one instead of using a fixed similarity cut-off"""
+        if not hits:
+            return hits
+        cutoff = max(self.min_similarity, hits[0].score * self.relative_similarity)
+        return [hit for hit in hits if hit.score >= cutoff]
+
+    def vector_is_decisive(self, hits: List) -> bool:
+        if len(hits) < 2:
+            return len(hits) == 1
+        return hits[0].score - hits[1].score >= self.vector_margin
+
+    def keyword_is_decisive(self, hits: List, phrase: str, keyword_index) -> bool:
+        """True when the whole phrase occurs in only a few chunks, led by the top hit,
+        and those clearly outscore every chunk that only matches individual words"""
+        if not hits or len(phrase) < self.min_phrase_length:
+            return False
+        needle = phrase.encode('utf-8')
+        exact = [keyword_index.contains(hit.index, needle) for hit in hits]
+        if not exact[0] or sum(exact) > self.context_size:
+            return False
+        best_partial = max((hit.score for hit, is_exact in zip(hits, exact) if not is_exact), default=0)
+        return hits[0].score >= self.keyword_margin * best_partial
+
+    def direct_answer(self, question: str, chunk, phrase: str, conversation_history=None) -> Optional[str]:
+        """Answer to a direct lookup taken straight from the chunk, or None to ask the LLM"""
+        if conversation_history:
+            return None  # follow-up questions need the LLM to connect the context
+        if len(question.split()) > self.max_direct_words:
+            return None
+        if chunk.type == 'question':
+            return self._printed_mcq_answer(chunk.text, phrase)
+        if chunk.type == 'vocabulary':
+            return self._glossary_entry(chunk.text, phrase)
+        return None
+
+    def _printed_mcq_answer(self, text: str, phrase: str) -> Optional[str]:
+        """The option named by the printed key (উত্তর: X) of the MCQ whose stem the phrase restates"""
+        phrase = normalize_question(phrase)
+        for mcq in parse_mcqs(text):
+            stem = normalize_question(mcq['question'])
+            # A fragment such as "উদ্দীপকে বর্ণিত" opens many stems; only a phrase covering
+            # (almost) the whole stem identifies the question the key belongs to
+            if mcq['answer_key'] and phrase in stem and len(phrase) >= self.min_stem_coverage * len(stem):
+                option = mcq['options'][OPTION_LETTERS.index(mcq['answer_key'])]
+                return f"উত্তর: ({mcq['answer_key']}) {option}"
+        return None  # no printed key: the LLM has to work out the answer
+
+    def _glossary_entry(self, text: str, phrase: str) -> Optional[str]:
+        """The glossary entry starting at the phrase, up to the next headword"""
+        position = text.lower().find(phrase)
+        if position < 0:
+            return None
+        # The OCR glossary only separates entries where the table had a visible break, so an
+        # entry is only trusted when such a delimiter ends it within max_entry_words words
+        entry_end = ENTRY_DELIMITER.search(text, position + len(phrase))
+        if entry_end is None:
+            return None
+        entry = text[position:entry_end.start()].strip()
+        if len(entry.split()) > self.max_entry_words or entry.lower() == phrase:
+            return None
+        return entry
@@ -0,0 +1,237 @@
+"""Production launcher: load the RAG artefacts once, then fork uvicorn workers.
+
+The parent process imports api.py (which builds the chunk store, embedding matrix,
+keyword index and encoder) before forking, so every worker shares those pages
+copy-on-write instead of loading its own copy. Any chunk encoding the parent needs
+(first build, reloads) runs in a spawned subprocess: torch thread pools started in
+the parent would not survive the fork.
+
+Reloads are coordinated here as well: the parent watches the source files and
+handles SIGHUP (sent by POST /api/admin/reload in any worker), rebuilds the
+index once, then replaces the workers with fresh forks that share the new
+version. Old workers finish their in-flight requests before exiting.
+
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Tokenizer thread pools do not survive fork; workers get their own torch threads instead
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+import uvicorn
+
+from hot_reload import IndexFileWatcher
+
+
+def read_memory(pid):
+    """RSS / PSS / shared memory of a process in MB, read from /proc (Linux only)"""
+    fields = {}
+    for path in (f'/proc/{pid}/smaps_rollup', f'/proc/{pid}/status'):
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    name, _, value = line.partition(':')
+                    parts = value.split()
+                    if len(parts) == 2 and parts[1] == 'kB':
+                        fields.setdefault(name, int(parts[0]))
+        except OSError:
+            continue
+
+    def mb(*names):
+        values = [fields[name] for name in names if name in fields]
+        return round(sum(values) / 1024, 1) if values else None
+
+    return {
+        'rss_mb': mb('Rss') if 'Rss' in fields else mb('VmRSS'),
+        'pss_mb': mb('Pss'),
+        'shared_mb': mb('Shared_Clean', 'Shared_Dirty'),
+    }
+
+
+def format_memory(label, pid):
+    memory = read_memory(pid)
+    return (f"{label} pid={pid} rss={memory['rss_mb']}MB pss={memory['pss_mb']}MB "
+            f"shared={memory['shared_mb']}MB")
+
+
+def run_worker(sock, args, threads_per_worker):
+    """Serve requests from the inherited listening socket (runs in the forked child)"""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    import api
+    config = uvicorn.Config(api.app, log_level=args.log_level, access_log=not args.no_access_log)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker launcher for the অপরিচিতা RAG API")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--memory-report-interval', type=int, default=60,
+                        help="seconds between per-worker memory reports (0 disables)")
+    parser.add_argument('--log-level', default='info')
+    parser.add_argument('--no-access-log', action='store_true')
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        print("⚠️ fork() is not available on this platform, starting a single worker")
+        uvicorn.run('api:app', host=args.host, port=args.port, log_level=args.log_level)
+        return
+
+    # Load every immutable artefact once, in the parent
+    print("📦 Loading RAG artefacts in the parent process...")
+    os.environ['RAG_LAUNCHER_PID'] = str(os.getpid())
+    import api
+    if api.rag_system is None:
+        sys.exit("❌ RAG system failed to load, not starting workers")
+    print(format_memory("📊 parent", os.getpid()))
+
+    # Move everything loaded so far out of the GC's reach, so collections in the
+    # workers do not write to (and thereby un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    threads_per_worker = max(1, (os.cpu_count() or 1) // args.workers)
+    workers = {}
+    retiring = set()  # previous-version workers draining their in-flight requests
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(sock, args, threads_per_worker)
+            finally:
+                os._exit(0)
+        workers[pid] = time.time()
+        print(f"🚀 Started worker pid={pid}")
+
+    def reload_and_replace_workers():
+        """Rebuild the index once, here, then swap the workers for forks sharing the new version"""
+        print("🔄 Reloading index in the launcher (workers keep serving the current version)...")
+        try:
+            version = api.rag_system.reload()
+        except Exception as e:
+            print(f"❌ Index reload failed, keeping the current version: {e}")
+            return
+        if version is None:
+            return
+        gc.collect()
+        gc.freeze()
+
+        previous = list(workers)
+        for _ in range(args.workers):
+            spawn()
+        for pid in previous:
+            del workers[pid]
+            retiring.add(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)  # uvicorn drains in-flight requests before exiting
+            except ProcessLookupError:
+                pass
+        print(f"♻️ Workers replaced with index version {version}")
+
+    for _ in range(args.workers):
+        spawn()
+
+    stopping = False
+    reload_requested = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    def request_reload(signum, frame):
+        nonlocal reload_requested
+        reload_requested = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGHUP, request_reload)
+
+    # Polled from this loop rather than a thread, so nothing else runs while forking
+    watcher = None
+    if api.INDEX_WATCH_INTERVAL > 0:
+        watcher = IndexFileWatcher(
+            [api.rag_system.processed_data_file, api.rag_system.answer_bank_file],
+            interval=api.INDEX_WATCH_INTERVAL
+        )
+
+    print(f"✅ Serving on http://{args.host}:{args.port} with {args.workers} workers")
+    last_report = time.time()
+    last_poll = time.time()
+    while not stopping:
+        time.sleep(1)
+
+        if watcher is not None and time.time() - last_poll >= watcher.interval:
+            last_poll = time.time()
+            if watcher.poll():
+                print("👀 Source files changed")
+                reload_requested = True
+        if reload_requested and not stopping:
+            reload_requested = False
+            reload_and_replace_workers()
+
+        # Reap replaced workers once they have drained
+        for pid in list(retiring):
+            try:
+                finished, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                finished = pid
+            if finished:
+                retiring.discard(pid)
+
+        # Replace workers that died
+        for pid in list(workers):
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if finished:
+                del workers[pid]
+                if stopping:
+                    continue
+                print(f"⚠️ Worker pid={pid} exited with status {status}, restarting")
+                spawn()
+
+        if args.memory_report_interval and time.time() - last_report >= args.memory_report_interval:
+            last_report = time.time()
+            print(format_memory("📊 parent", os.getpid()))
+            for pid in workers:
+                print(format_memory("📊 worker", pid))
+
+    print("🛑 Stopping workers...")
+    remaining = list(workers) + list(retiring)
+    for pid in remaining:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in remaining:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()